@@ -1,155 +1,251 @@
-from collections import namedtuple
-from functools import partial
-from itertools import chain, dropwhile, takewhile
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 import re
 
 import sublime
-from .fns import accumulate, flatten, pairwise, tail
 
 
 MYPY = False
 if MYPY:
-    from typing import Final, Iterator, List, NamedTuple, Optional, Tuple, Type
+    from typing import Final, Iterator, List, Optional, Tuple, Union
     from .types import LineNo
 
 
-if MYPY:
-    SplittedDiffBase = NamedTuple(
-        'SplittedDiff', [
-            ('commits', Tuple['CommitHeader', ...]),
-            ('headers', Tuple['FileHeader', ...]),
-            ('hunks', Tuple['Hunk', ...])
-        ]
+class SplittedDiff:
+    __slots__ = (
+        'commits', 'headers', 'hunks',
+        '_commit_a', '_header_a', '_hunk_a', '_hunk_b', '_first_hunk_of_header'
     )
-else:
-    SplittedDiffBase = namedtuple('SplittedDiff', 'commits headers hunks')
 
+    def __init__(self, commits, headers, hunks):
+        # type: (Tuple[CommitHeader, ...], Tuple[FileHeader, ...], Tuple[Hunk, ...]) -> None
+        self.commits = commits  # type: Final[Tuple[CommitHeader, ...]]
+        self.headers = headers  # type: Final[Tuple[FileHeader, ...]]
+        self.hunks = hunks  # type: Final[Tuple[Hunk, ...]]
+        # All sections are in file order, so we can store their start and
+        # end offsets in flat arrays and `bisect` them without touching
+        # the section objects themselves.
+        self._commit_a = array('q', [c.a for c in commits])
+        self._header_a = array('q', [h.a for h in headers])
+        self._hunk_a = array('q', [h.a for h in hunks])
+        self._hunk_b = array('q', [h.b for h in hunks])
+        # Index of the first hunk following each header; the hunks of
+        # header `i` are `hunks[first[i]:first[i + 1]]`.
+        self._first_hunk_of_header = array('q')
+        j = 0
+        for a in self._header_a:
+            while j < len(hunks) and self._hunk_a[j] < a:
+                j += 1
+            self._first_hunk_of_header.append(j)
+
+    def __repr__(self):
+        # type: () -> str
+        return "SplittedDiff(commits={!r}, headers={!r}, hunks={!r})".format(
+            self.commits, self.headers, self.hunks
+        )
 
-class SplittedDiff(SplittedDiffBase):
     @classmethod
     def from_string(cls, text, offset=0):
         # type: (str, int) -> SplittedDiff
-        factories = {'commit': CommitHeader, 'diff': FileHeader, '@@': Hunk}
-        containers = {'commit': [], 'diff': [], '@@': []}
-        sections = (
-            (match.group(1), match.start())
-            for match in re.finditer(r'^(commit|diff|@@)', text, re.M)
-        )
-        for (id, start), (_, end) in pairwise(chain(sections, [('END', len(text) + 1)])):
-            containers[id].append(factories[id](text[start:end], start + offset, end + offset))
-
-        return cls(
-            tuple(containers['commit']),
-            tuple(containers['diff']),
-            tuple(containers['@@'])
-        )
+        commits = []  # type: List[CommitHeader]
+        headers = []  # type: List[FileHeader]
+        hunks = []  # type: List[Hunk]
+        # We scan the `str` itself and not an encoded copy: for ASCII
+        # texts CPython already stores one byte per char and `re` and
+        # `str.find` work on that buffer directly, while its offsets
+        # are the ones Sublime uses.
+        matches = list(SECTION_START_RE.finditer(text))
+        bounds = [match.start() for match in matches]
+        bounds.append(len(text) + 1)
+        for i, match in enumerate(matches):
+            id, at_signs, eol = match.groups()
+            start, end = bounds[i], bounds[i + 1]
+            if id is None:
+                # For hunks, the pattern consumes the complete "@@" line, so
+                # we know the mode and where the content starts right away.
+                hunks.append(Hunk(
+                    _BufferView(text, start, end), start + offset, end + offset,
+                    mode_len=len(at_signs) - 1,
+                    content_start=match.end() - start if eol else None
+                ))
+            elif id == 'diff':
+                headers.append(FileHeader(_BufferView(text, start, end), start + offset, end + offset))
+            else:
+                commits.append(CommitHeader(_BufferView(text, start, end), start + offset, end + offset))
+
+        return cls(tuple(commits), tuple(headers), tuple(hunks))
 
     @classmethod
     def from_view(cls, view):
         # type: (sublime.View) -> SplittedDiff
-        return cls.from_string(view.substr(sublime.Region(0, view.size())))
+        return _parse_view(view.id(), view.change_count())
 
     def head_and_hunk_for_pt(self, pt):
         # type: (int) -> Optional[Tuple[FileHeader, Hunk]]
-        hunk = self.hunk_for_pt(pt)
-        if hunk:
-            return self.head_for_hunk(hunk), hunk
-        else:
+        i = bisect_right(self._hunk_a, pt) - 1
+        if i < 0 or pt >= self._hunk_b[i]:
             return None
+        j = bisect_left(self._header_a, self._hunk_a[i]) - 1
+        if j < 0:
+            raise ValueError("no file header before {}".format(self._hunk_a[i]))
+        return self.headers[j], self.hunks[i]
 
     def hunk_for_pt(self, pt):
         # type: (int) -> Optional[Hunk]
-        for hunk in self.hunks:
-            if hunk.a <= pt < hunk.b:
-                return hunk
-        else:
-            return None
+        i = bisect_right(self._hunk_a, pt) - 1
+        if i >= 0 and pt < self._hunk_b[i]:
+            return self.hunks[i]
+        return None
 
     def head_for_hunk(self, hunk):
         # type: (Hunk) -> FileHeader
-        return max(
-            (header for header in self.headers if header.a < hunk.a),
-            key=lambda h: h.a
-        )
+        i = bisect_left(self._header_a, hunk.a) - 1
+        if i < 0:
+            raise ValueError("no file header before {}".format(hunk.a))
+        return self.headers[i]
 
     def hunks_for_head(self, head):
         # type: (FileHeader) -> Iterator[Hunk]
-        return takewhile(
-            lambda x: isinstance(x, Hunk),
-            tail(dropwhile(
-                lambda x: x != head,
-                sorted(self.headers + self.hunks, key=lambda x: x.a)
-            ))
-        )
+        idx = bisect_left(self._header_a, head.a)
+        if idx == len(self.headers) or self.headers[idx] != head:
+            return iter(())
+
+        lo = self._first_hunk_of_header[idx]
+        if idx + 1 < len(self.headers):
+            hi = self._first_hunk_of_header[idx + 1]
+        else:
+            hi = len(self.hunks)
+        return iter(self.hunks[lo:hi])
 
     def commit_for_hunk(self, hunk):
         # type: (Hunk) -> Optional[CommitHeader]
-        try:
-            return max(
-                (commit for commit in self.commits if commit.a < hunk.a),
-                key=lambda c: c.a
-            )
-        except ValueError:
+        i = bisect_left(self._commit_a, hunk.a) - 1
+        if i < 0:
             return None
+        return self.commits[i]
 
 
-HEADER_TO_FILE_RE = re.compile(r'\+\+\+ b/(.+?)\t?$')
+@lru_cache(maxsize=16)
+def _parse_view(vid, _change_count):
+    # type: (sublime.ViewId, int) -> SplittedDiff
+    # Keyed on the change count so we only re-parse after an edit.
+    view = sublime.View(vid)
+    return SplittedDiff.from_string(view.substr(sublime.Region(0, view.size())))
+
+
+SECTION_START_RE = re.compile(r'^(?:(commit|diff)|(@@+)[^\n]*(\n)?)', re.M)
+
+
+class _BufferView:
+    """Lazy slice `buf[a:b]` of a bigger text buffer."""
+    __slots__ = ('buf', 'a', 'b')
+
+    def __init__(self, buf, a, b):
+        # type: (str, int, int) -> None
+        self.buf = buf  # type: Final[str]
+        self.a = a  # type: Final[int]
+        self.b = b  # type: Final[int]
+
+    def __len__(self):
+        # type: () -> int
+        return max(0, min(self.b, len(self.buf)) - self.a)
+
+    @property
+    def text(self):
+        # type: () -> str
+        return self.buf[self.a:self.b]
 
 
 class TextRange:
+    __slots__ = ('_text', 'a', 'b', '_lines', '_region')
+
     def __init__(self, text, a=0, b=None):
-        # type: (str, int, int) -> None
+        # type: (Union[str, _BufferView], int, int) -> None
         if b is None:
             b = a + len(text)
-        self.text = text  # type: Final[str]
+        self._text = text  # type: Union[str, _BufferView]
         self.a = a  # type: Final[int]
         self.b = b  # type: Final[int]
+        self._lines = None  # type: Optional[List[TextRange]]
+        self._region = None  # type: Optional[Region]
 
-    def _as_tuple(self):
-        # type: () -> Tuple[str, int, int]
-        return (self.text, self.a, self.b)
+    @property
+    def text(self):
+        # type: () -> str
+        text = self._text
+        if isinstance(text, _BufferView):
+            text = self._text = text.text
+        return text
 
     def __hash__(self):
         # type: () -> int
-        return hash(self._as_tuple())
+        return hash(self.text) ^ (self.a * 0x9E3779B9) ^ self.b
 
     def __eq__(self, other):
         # type: (object) -> bool
         if isinstance(other, TextRange):
-            return self._as_tuple() == other._as_tuple()
+            return (
+                self.a == other.a
+                and self.b == other.b
+                and self.text == other.text
+            )
         return False
 
     def region(self):
         # type: () -> Region
-        return Region(self.a, self.b)
-
-    def lines(self, _factory=None):
-        # type: (Type[TextRange]) -> List[TextRange]
-        factory = _factory or TextRange
-        lines = self.text.splitlines(keepends=True)
-        return [
-            factory(line, *a_b)
-            for line, a_b in zip(lines, pairwise(accumulate(map(len, lines), initial=self.a)))
-        ]
+        if self._region is None:
+            self._region = Region(self.a, self.b)
+        return self._region
+
+    def lines(self):
+        # type: () -> List[TextRange]
+        if self._lines is None:
+            rv = []  # type: List[TextRange]
+            a = self.a
+            for line in self.text.splitlines(keepends=True):
+                b = a + len(line)
+                rv.append(TextRange(line, a, b))
+                a = b
+            self._lines = rv
+        return self._lines
 
 
 class CommitHeader(TextRange):
+    __slots__ = ()
+
     def commit_hash(self):
         # type: () -> Optional[str]
-        first_line = self.text[:self.text.index('\n')]
-        if first_line.startswith('commit '):
-            return first_line.split(' ')[1]
-        return None
+        text = self.text
+        if not text.startswith('commit '):
+            return None
+
+        eol = text.find('\n')
+        if eol < 0:
+            eol = len(text)
+        end = text.find(' ', 7, eol)
+        return text[7:end if end >= 0 else eol]
 
 
 class FileHeader(TextRange):
+    __slots__ = ()
+
     def from_filename(self):
         # type: () -> Optional[str]
-        match = HEADER_TO_FILE_RE.search(self.text)
-        if not match:
-            return None
+        text = self.text
+        if text.startswith('+++ b/'):
+            start = 6
+        else:
+            idx = text.find('\n+++ b/')
+            if idx < 0:
+                return None
+            start = idx + 7
 
-        return match.group(1)
+        end = text.find('\n', start)
+        filename = text[start:end] if end >= 0 else text[start:]
+        if filename.endswith('\t'):
+            filename = filename[:-1]
+        return filename or None
 
     def first_line(self):
         # type: () -> str
@@ -157,27 +253,50 @@ class FileHeader(TextRange):
 
 
 class Hunk(TextRange):
+    __slots__ = ('_mode_len', '_content_start', '_header', '_content')
+
+    def __init__(self, text, a=0, b=None, mode_len=None, content_start=None):
+        # type: (Union[str, _BufferView], int, int, Optional[int], Optional[int]) -> None
+        super().__init__(text, a, b)
+        self._mode_len = mode_len
+        self._content_start = content_start
+        self._header = None  # type: Optional[HunkHeader]
+        self._content = None  # type: Optional[HunkContent]
+
     def mode_len(self):
         # type: () -> int
-        return len(list(takewhile(lambda x: x == '@', self.text))) - 1
+        if self._mode_len is None:
+            text = self.text
+            i = 0
+            while i < len(text) and text[i] == '@':
+                i += 1
+            self._mode_len = i - 1
+        return self._mode_len
+
+    def content_start(self):
+        # type: () -> int
+        if self._content_start is None:
+            self._content_start = self.text.index('\n') + 1
+        return self._content_start
 
     def header(self):
         # type: () -> HunkHeader
-        content_start = self.text.index('\n') + 1
-        return HunkHeader(self.text[:content_start], self.a, self.a + content_start)
+        if self._header is None:
+            content_start = self.content_start()
+            self._header = HunkHeader(self.text[:content_start], self.a, self.a + content_start)
+        return self._header
 
     def content(self):
         # type: () -> HunkContent
-        content_start = self.text.index('\n') + 1
-        return HunkContent(
-            self.text[content_start:],
-            self.a + content_start,
-            self.b,
-            self.mode_len()
-        )
-
-
-SAFE_PARSE_HUNK_HEADER = re.compile(r"[-+](\d+)(?:,(\d+))?")
+        if self._content is None:
+            content_start = self.content_start()
+            self._content = HunkContent(
+                self.text[content_start:],
+                self.a + content_start,
+                self.b,
+                self.mode_len()
+            )
+        return self._content
 
 
 class UnsupportedCombinedDiff(RuntimeError):
@@ -185,6 +304,13 @@ class UnsupportedCombinedDiff(RuntimeError):
 
 
 class HunkHeader(TextRange):
+    __slots__ = ('_metadata',)
+
+    def __init__(self, text, a=0, b=None):
+        # type: (str, int, int) -> None
+        super().__init__(text, a, b)
+        self._metadata = None  # type: Optional[List[Tuple[LineNo, int]]]
+
     def to_line_start(self):
         # type: () -> LineNo
         """Extract the starting line at "b" encoded in the hunk header
@@ -206,7 +332,8 @@ class HunkHeader(TextRange):
         if len(metadata) > 2:
             raise UnsupportedCombinedDiff(self.text)
         assert len(metadata) == 2
-        return tuple(flatten(metadata))  # type: ignore[return-value]
+        (a_start, a_length), (b_start, b_length) = metadata
+        return (a_start, a_length, b_start, b_length)
 
     def safely_parse_metadata(self):
         # type: () -> List[Tuple[LineNo, int]]
@@ -217,32 +344,68 @@ class HunkHeader(TextRange):
         We do not extract the `-+` signs.  All leading segments have a
         `-` sign, and the last segment has a `+`.
         """
-        return [
-            (int(start), int(length or "1"))
-            for start, length in SAFE_PARSE_HUNK_HEADER.findall(
-                self.text.lstrip("@").split("@", 1)[0]
-            )
-        ]
+        if self._metadata is None:
+            self._metadata = _parse_hunk_header_metadata(self.text)
+        return self._metadata
+
+
+def _parse_hunk_header_metadata(text):
+    # type: (str) -> List[Tuple[LineNo, int]]
+    # Handwritten equivalent of `[-+](\d+)(?:,(\d+))?` applied to the
+    # part between the leading and the trailing "@@".
+    end = len(text)
+    i = 0
+    while i < end and text[i] == '@':
+        i += 1
+    at = text.find('@', i)
+    if at >= 0:
+        end = at
+
+    rv = []  # type: List[Tuple[LineNo, int]]
+    while i < end:
+        c = text[i]
+        i += 1
+        if c != '-' and c != '+':
+            continue
+        j = i
+        while j < end and '0' <= text[j] <= '9':
+            j += 1
+        if j == i:
+            continue
+        start = int(text[i:j])
+        length = 1
+        if j + 1 < end and text[j] == ',' and '0' <= text[j + 1] <= '9':
+            k = j + 1
+            while k < end and '0' <= text[k] <= '9':
+                k += 1
+            length = int(text[j + 1:k])
+            j = k
+        rv.append((start, length))
+        i = j
+    return rv
 
 
 class HunkLine(TextRange):
+    __slots__ = ('mode_len', '_mode')
+
     def __init__(self, text, a=0, b=None, mode_len=1):
         # type: (str, int, int, int) -> None
         super().__init__(text, a, b)
         self.mode_len = mode_len  # type: Final[int]
+        self._mode = text[:mode_len]  # type: Final[str]
 
     def is_from_line(self):
         # type: () -> bool
-        return '-' in self.mode
+        return '-' in self._mode
 
     def is_to_line(self):
         # type: () -> bool
-        return '+' in self.mode
+        return '+' in self._mode
 
     @property
     def mode(self):
         # type: () -> str
-        return self.text[:self.mode_len]
+        return self._mode
 
     @property
     def content(self):
@@ -250,13 +413,15 @@ class HunkLine(TextRange):
         return self.text[self.mode_len:]
 
     def is_context(self):
-        return self.mode.strip() == ''
+        return self._mode.strip() == ''
 
     def is_no_newline_marker(self):
         return self.text.strip() == "\\ No newline at end of file"
 
 
 class HunkContent(TextRange):
+    __slots__ = ('mode_len',)
+
     def __init__(self, text, a=0, b=None, mode_len=1):
         # type: (str, int, int, int) -> None
         super().__init__(text, a, b)
@@ -264,14 +429,37 @@ class HunkContent(TextRange):
 
     def lines(self):  # type: ignore
         # type: () -> List[HunkLine]
-        factory = partial(HunkLine, mode_len=self.mode_len)
-        return super().lines(_factory=factory)  # type: ignore
+        if self._lines is None:
+            mode_len = self.mode_len
+            self._lines = [
+                HunkLine(line, a, b, mode_len)
+                for line, a, b in _split_lf_keepends(self.text, self.a)
+            ]
+        return self._lines  # type: ignore
+
+
+def _split_lf_keepends(text, offset):
+    # type: (str, int) -> List[Tuple[str, int, int]]
+    # Diffs only use "\n" as line separator, so unlike `splitlines` we
+    # don't need to look for all the other (universal) line endings.
+    rv = []  # type: List[Tuple[str, int, int]]
+    find = text.find
+    pos = 0
+    while True:
+        nl = find('\n', pos)
+        if nl < 0:
+            break
+        rv.append((text[pos:nl + 1], offset + pos, offset + nl + 1))
+        pos = nl + 1
+    if pos < len(text):
+        rv.append((text[pos:], offset + pos, offset + len(text)))
+    return rv
 
 
 class Region(sublime.Region):
     def __hash__(self):
         # type: () -> int
-        return hash((self.a, self.b))
+        return (self.a * 1315423911) ^ self.b
 
     def __iter__(self):
         # type: () -> Iterator[int]